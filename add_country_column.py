@@ -6,48 +6,31 @@ from sqlalchemy import text
 from app.database import engine
 
 def add_country_column():
-    """Add country column to users table if it doesn't exist"""
+    """Add country and git_username columns to users table if they don't exist"""
     with engine.connect() as conn:
-        # Check if column exists
-        result = conn.execute(text("""
-            SELECT column_name 
-            FROM information_schema.columns 
-            WHERE table_name='users' AND column_name='country'
-        """))
-        
-        if result.fetchone():
-            print("Column 'country' already exists. Skipping.")
-            return
-        
-        # Add country column
+        # Add both columns in one statement (one lock acquisition); IF NOT EXISTS
+        # makes a separate information_schema check unnecessary
         conn.execute(text("""
-            ALTER TABLE users 
-            ADD COLUMN country VARCHAR(10)
+            ALTER TABLE users
+            ADD COLUMN IF NOT EXISTS country VARCHAR(10),
+            ADD COLUMN IF NOT EXISTS git_username VARCHAR(255) UNIQUE
         """))
-        
-        # Add index on country column
+        conn.commit()
+    
+    # Build indexes without blocking writers; CONCURRENTLY is not allowed
+    # inside a transaction, so these run on an autocommit connection
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # Index builds on a large table can outlast the engine's statement_timeout
+        conn.execute(text("SET statement_timeout = 0"))
         conn.execute(text("""
-            CREATE INDEX IF NOT EXISTS ix_users_country ON users(country)
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_country ON users(country)
         """))
-        
-        # Check if git_username column exists, if not add it
-        result = conn.execute(text("""
-            SELECT column_name 
-            FROM information_schema.columns 
-            WHERE table_name='users' AND column_name='git_username'
+        conn.execute(text("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_git_username ON users(git_username)
         """))
-        
-        if not result.fetchone():
-            conn.execute(text("""
-                ALTER TABLE users 
-                ADD COLUMN git_username VARCHAR(255) UNIQUE
-            """))
-            conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS ix_users_git_username ON users(git_username)
-            """))
-        
-        conn.commit()
-        print("Successfully added 'country' column to users table.")
+        conn.execute(text("RESET statement_timeout"))
+    
+    print("Ensured 'country' and 'git_username' columns exist on users table.")
 
 if __name__ == "__main__":
     try:
@@ -4,6 +4,7 @@ from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy import text
 
 from alembic import context
 
@@ -24,6 +25,9 @@ if config.config_file_name is not None:
 # Set the target metadata
 target_metadata = Base.metadata
 
+# Postgres advisory lock key serializing migrations across processes
+MIGRATION_LOCK_KEY = 472839201
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode."""
     url = SQLALCHEMY_DATABASE_URL
@@ -46,13 +50,21 @@ def run_migrations_online():
     )
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=target_metadata
-        )
+        # Session-level lock (not pg_advisory_xact_lock) so it survives the
+        # autocommit blocks used for CREATE INDEX CONCURRENTLY
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        connection.commit()
+        try:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata
+            )
 
-        with context.begin_transaction():
-            context.run_migrations()
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
 
 if context.is_offline_mode():
     run_migrations_offline()
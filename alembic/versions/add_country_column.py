@@ -20,21 +20,30 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Add country column to users table."""
-    # Check if country column exists before adding
+    # Check which of the new columns already exist with a single targeted query
+    # (full table reflection would scan the catalog for every column)
     connection = op.get_bind()
-    inspector = sa.inspect(connection)
-    columns = [col['name'] for col in inspector.get_columns('users')]
+    columns = {
+        row[0] for row in connection.execute(sa.text("""
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_name = 'users' AND column_name IN ('country', 'git_username')
+        """))
+    }
     
     # Add country column if it doesn't exist
     if 'country' not in columns:
         op.add_column('users', sa.Column('country', sa.String(length=10), nullable=True))
-        # Add index on country column
-        op.create_index('ix_users_country', 'users', ['country'], unique=False)
     
     # Add git_username column if it doesn't exist
     if 'git_username' not in columns:
         op.add_column('users', sa.Column('git_username', sa.String(length=255), nullable=True))
-        op.create_index('ix_users_git_username', 'users', ['git_username'], unique=True)
+    
+    # Build indexes without blocking writes to users; CONCURRENTLY cannot run
+    # inside the migration transaction, so step out of it for these statements
+    with op.get_context().autocommit_block():
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_country ON users (country)')
+        op.execute('CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_users_git_username ON users (git_username)')
 
 
 def downgrade() -> None:
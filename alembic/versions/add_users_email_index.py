@@ -0,0 +1,30 @@
+"""Add index on users.email
+
+Revision ID: add_users_email_index
+Revises: add_country_column
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_users_email_index'
+down_revision: Union[str, None] = 'add_country_column'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add index on users.email (used by the per-batch duplicate email check)."""
+    # Build without blocking writes to users; CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email ON users (email)')
+
+
+def downgrade() -> None:
+    """Remove index on users.email."""
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_users_email')
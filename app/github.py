@@ -1,13 +1,64 @@
 import requests
+import orjson
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 import time
 import re
+import random
+import heapq
+from collections import deque
+import sqlite3
+import io
 from dotenv import load_dotenv
 import os
-from typing import Optional, List
-from threading import Lock
+import logging
+from typing import Optional, List, Tuple
+from threading import Lock, Condition
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from types import MappingProxyType
+
+try:
+    import ijson
+except ImportError:  # commit lists are then downloaded and parsed in full
+    ijson = None
+
+try:
+    import re2 as _tz_regex  # google-re2 / pyre2: linear-time DFA matching
+except ImportError:
+    _tz_regex = re
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Matches the author/committer lines of a signed commit payload, capturing the
+# role and the trailing timezone offset (e.g. 'author Name <e> 1700000000 +0300')
+# (inline (?m) flag since RE2 bindings don't all accept re.MULTILINE)
+TZ_RE = _tz_regex.compile(r'(?m)^(?P<role>author|committer) .*? \d+ (?P<tz>[+-]\d{4})$')
+
+# Shared read-only default for missing JSON objects, avoids allocating `{}` per lookup
+_EMPTY = MappingProxyType({})
+
+# Maximum number of users processed concurrently (by app/main.py), and of repos
+# whose commits are fetched at once for each of them
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "10"))
+MAX_COMMIT_REPOS = 5
+
+# Shared session so calls to api.github.com reuse keep-alive TCP/TLS connections,
+# with room for one connection per user in flight plus their commit fetches.
+# The Authorization header is kept up to date by TokenManager as tokens rotate.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=max(32, MAX_CONCURRENCY * (MAX_COMMIT_REPOS + 1)),
+    max_retries=0
+))
+_session.headers.update({
+    "Accept": "application/vnd.github+json",
+    "X-GitHub-Api-Version": "2022-11-28",
+})
+
 class TokenManager:
     """Manages multiple GitHub tokens with rotation and rate limit handling"""
     
@@ -30,111 +81,220 @@ class TokenManager:
             )
         
         self.current_token_index = 0
-        self.rate_limited_tokens = {}  # token_index -> reset_time
+        # Ring of usable token indices in rotation order (current token last),
+        # and a heap of (reset_time, token_index) for rate-limited tokens
+        self._available = deque(range(len(self.tokens)))
+        self._available.rotate(-1)
+        self._limited = []
         self.lock = Lock()
-        print(f"[TokenManager] Initialized with {len(self.tokens)} tokens")
+        # Waiting on this releases self.lock, so other threads can keep reading the
+        # current token while one waits for a reset; notified when tokens come back
+        self._tokens_available = Condition(self.lock)
+        self._apply_current_token()
+        logger.info("[TokenManager] Initialized with %s tokens", len(self.tokens))
     
     def get_current_token(self) -> Optional[str]:
         """Get the current active token"""
         with self.lock:
             return self.tokens[self.current_token_index] if self.tokens else None
     
-    def get_headers(self) -> dict:
-        """Get headers with current token"""
-        token = self.get_current_token()
-        if not token:
-            return {}
-        return {"Authorization": f"token {token}"}
-    
     def mark_rate_limited(self, reset_time: int):
         """Mark current token as rate limited until reset_time"""
         with self.lock:
-            self.rate_limited_tokens[self.current_token_index] = reset_time
-            print(f"[TokenManager] Token {self.current_token_index + 1}/{len(self.tokens)} rate limited until {reset_time}")
+            if self.current_token_index in self._available:
+                self._available.remove(self.current_token_index)
+                heapq.heappush(self._limited, (reset_time, self.current_token_index))
+            logger.warning("[TokenManager] Token %s/%s rate limited until %s", self.current_token_index + 1, len(self.tokens), reset_time)
             self._switch_to_available_token()
+            self._apply_current_token()
+    
+    def _apply_current_token(self):
+        """Point the shared session's Authorization header at the current token"""
+        _session.headers["Authorization"] = f"token {self.tokens[self.current_token_index]}"
     
     def _switch_to_available_token(self):
         """Switch to next available token that's not rate limited"""
-        current_time = int(time.time())
-        available_indices = []
-        
-        for i in range(len(self.tokens)):
-            reset_time = self.rate_limited_tokens.get(i, 0)
-            if reset_time <= current_time:
-                # Token is available
-                if reset_time > 0:
-                    # Was rate limited, now available
-                    del self.rate_limited_tokens[i]
-                    print(f"[TokenManager] Token {i + 1}/{len(self.tokens)} is now available")
-                available_indices.append(i)
-        
-        if not available_indices:
-            # All tokens are rate limited, find the one with earliest reset
-            earliest_reset = min(self.rate_limited_tokens.values())
-            wait_time = max(earliest_reset - current_time, 0)
-            print(f"[TokenManager] All tokens rate limited. Waiting {wait_time}s for earliest reset...")
-            time.sleep(wait_time + 1)
-            # Retry after waiting
-            return self._switch_to_available_token()
-        
-        # Find next available token starting from current
-        for i in range(len(self.tokens)):
-            next_index = (self.current_token_index + i + 1) % len(self.tokens)
-            if next_index in available_indices:
-                self.current_token_index = next_index
-                print(f"[TokenManager] Switched to token {self.current_token_index + 1}/{len(self.tokens)}")
-                return
+        while True:
+            current_time = int(time.time())
+            
+            # Move tokens whose reset time has passed back into the ring
+            while self._limited and self._limited[0][0] <= current_time:
+                _, i = heapq.heappop(self._limited)
+                self._available.append(i)
+                logger.info("[TokenManager] Token %s/%s is now available", i + 1, len(self.tokens))
+                self._tokens_available.notify_all()
+            
+            if self._available:
+                break
+            
+            # All tokens are rate limited, wait for the earliest reset (or for another
+            # waiting thread to bring a token back first)
+            wait_time = max(self._limited[0][0] - current_time, 0)
+            logger.warning("[TokenManager] All tokens rate limited. Waiting %ss for earliest reset...", wait_time)
+            self._tokens_available.wait(timeout=wait_time + 1)
         
-        # Fallback to first available
-        self.current_token_index = available_indices[0]
-        print(f"[TokenManager] Switched to token {self.current_token_index + 1}/{len(self.tokens)}")
+        # Take the next token in rotation order and move it to the back of the ring
+        self.current_token_index = self._available[0]
+        self._available.rotate(-1)
+        logger.info("[TokenManager] Switched to token %s/%s", self.current_token_index + 1, len(self.tokens))
 
 # Initialize token manager
 token_manager = TokenManager()
 
-def safe_get(url, max_retries=3):
-    """Make a GET request with automatic token rotation on rate limits"""
+# Commit lists for a user's repos are fetched concurrently on a shared pool, sized
+# so every user in flight gets its own MAX_COMMIT_REPOS workers instead of
+# queueing behind other users' fetches
+_commit_pool = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENCY * MAX_COMMIT_REPOS, thread_name_prefix="github-commits"
+)
+
+class EtagCache:
+    """Disk-backed (etag, headers, body) store per URL, used to send conditional GitHub requests"""
+    
+    def __init__(self, path: str):
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS etag_responses "
+            "(url TEXT PRIMARY KEY, etag TEXT NOT NULL, headers BLOB NOT NULL, body BLOB NOT NULL)"
+        )
+        self.conn.commit()
+    
+    def get(self, url: str) -> Optional[Tuple[str, dict, bytes]]:
+        """Get the cached (etag, headers, body) for a URL"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, headers, body FROM etag_responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, headers, body = row
+        return etag, orjson.loads(headers), body
+    
+    def put(self, url: str, etag: str, headers: dict, body: bytes):
+        """Store the latest etag, headers and body for a URL"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO etag_responses (url, etag, headers, body) VALUES (?, ?, ?, ?)",
+                (url, etag, orjson.dumps(headers), body)
+            )
+            self.conn.commit()
+
+etag_cache = EtagCache(os.getenv("GITHUB_ETAG_CACHE", ".github_etag_cache.sqlite3"))
+
+def _retry_after(res) -> Optional[float]:
+    """Get the Retry-After delay in seconds from a response, if it has one"""
+    if res is None:
+        return None
+    try:
+        return float(res.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+def safe_get(url, max_retries=3, stream=False, conditional=False):
+    """
+    Make a GET request with automatic token rotation on rate limits.
+    With conditional=True (for URLs revisited across runs, like /users pages and
+    profiles), repeat requests are sent with If-None-Match; a 304 (which does not
+    count against the rate limit) is answered from the ETag cache as a 200.
+    Other responses are not cached, so one-off repo/commit listings don't grow it.
+    """
+    if stream or not conditional:
+        return _safe_request("GET", url, max_retries, stream=stream)
+    
+    cached = etag_cache.get(url)
+    headers = {"If-None-Match": cached[0]} if cached else None
+    res = _safe_request("GET", url, max_retries, headers=headers)
+    
+    if res.status_code == 304 and cached:
+        return _cached_response(res, cached[1], cached[2])
+    if res.status_code == 200 and "ETag" in res.headers:
+        etag_cache.put(url, res.headers["ETag"], _entity_headers(res.headers), res.content)
+    
+    return res
+
+# Headers describing the stored body rather than the exchange; res.content is already
+# decoded, so the transfer/content encodings of the original response don't apply to it
+_BODY_HEADERS = ("content-type", "content-language", "last-modified", "link")
+
+def _entity_headers(headers) -> dict:
+    """Pick the headers worth storing alongside a cached body"""
+    return {k: v for k, v in headers.items() if k.lower() in _BODY_HEADERS}
+
+def _cached_response(not_modified, headers: dict, body: bytes) -> requests.Response:
+    """Build a 200 response from a cached body, for a 304 answer to a conditional request"""
+    res = requests.Response()
+    res.status_code = 200
+    res.reason = "OK"
+    res.url = not_modified.url
+    res.request = not_modified.request
+    res.elapsed = not_modified.elapsed
+    # Fresh exchange headers (ETag, rate limits, Date) from the 304, body headers from the cache
+    res.headers = CaseInsensitiveDict(not_modified.headers)
+    for name in ("Content-Length", "Content-Encoding", "Transfer-Encoding"):
+        res.headers.pop(name, None)
+    res.headers.update(headers)
+    res.headers["Content-Length"] = str(len(body))
+    res.raw = io.BytesIO(body)
+    return res
+
+def safe_post(url, json=None, max_retries=3):
+    """Make a POST request with automatic token rotation on rate limits"""
+    return _safe_request("POST", url, max_retries, json=json)
+
+def _safe_request(method, url, max_retries=3, **kwargs):
+    """Send a request on the shared session, rotating tokens on rate limits"""
     for attempt in range(max_retries):
+        res = None
         try:
-            headers = token_manager.get_headers()
-            if not headers:
-                raise ValueError("No available GitHub tokens!")
-            
-            res = requests.get(url, headers=headers, timeout=30)
+            res = _session.request(method, url, timeout=30, **kwargs)
             
             # Check for rate limiting (403 or 429)
             if res.status_code in [403, 429]:
+                # Release the connection before retrying (a streamed body is never read)
+                res.close()
                 if "X-RateLimit-Reset" in res.headers:
                     reset = int(res.headers["X-RateLimit-Reset"])
                     token_manager.mark_rate_limited(reset)
                     # Retry with new token
                     continue
                 else:
-                    # Rate limited but no reset time, wait a bit
-                    print(f"[RateLimit] Rate limited (no reset time), waiting 60s...")
-                    time.sleep(60)
+                    # Rate limited but no reset time, wait as long as the server asks (default 60s)
+                    delay = _retry_after(res) or 60
+                    logger.warning("[RateLimit] Rate limited (no reset time), waiting %.0fs...", delay)
+                    time.sleep(delay)
                     continue
             
-            # Check for other error status codes
-            if res.status_code != 200:
-                print(f"[ERROR] GitHub API returned status {res.status_code} for {url}")
-                print(f"[ERROR] Response: {res.text[:200]}")
+            # Check for other error status codes (304 is a conditional-request hit)
+            if res.status_code not in [200, 304]:
+                logger.error("GitHub API returned status %s for %s", res.status_code, url)
+                logger.error("Response: %s", res.text[:200])
                 return res
             
             return res
             
         except Exception as e:
             if attempt < max_retries - 1:
-                print(f"[WARNING] Request failed (attempt {attempt + 1}/{max_retries}): {e}")
-                time.sleep(2 ** attempt)  # Exponential backoff
+                logger.warning("Request failed (attempt %s/%s): %s", attempt + 1, max_retries, e)
+                # Exponential backoff with full jitter so concurrent threads don't retry in
+                # lockstep; a server-provided Retry-After takes precedence when longer
+                delay = min(60, random.uniform(0, 2 ** attempt))
+                time.sleep(max(delay, _retry_after(res) or 0))
                 continue
             else:
-                print(f"[ERROR] Request failed after {max_retries} attempts: {e}")
+                logger.error("Request failed after %s attempts: %s", max_retries, e)
                 raise
     
     # If we get here, all retries failed
     raise Exception(f"Failed to get {url} after {max_retries} attempts")
 
+def clear_user_caches():
+    """Drop per-user lookups cached for the previous batch"""
+    _fetch_user_repos.cache_clear()
+    _query_user_commit_metadata.cache_clear()
+
 def get_active_github_users(since=0):
     """
     Fetch GitHub users starting from the given 'since' ID.
@@ -142,173 +302,293 @@ def get_active_github_users(since=0):
     If no users are returned, next_since_value will be None.
     """
     url = f"https://api.github.com/users?since={since}&per_page=100"
-    res = safe_get(url)
+    res = safe_get(url, conditional=True)
     try:
-        users = res.json()
+        users = orjson.loads(res.content)
         if not isinstance(users, list):
             return [], None
         
         if len(users) == 0:
             return [], None
         
-        # Calculate next 'since' value by incrementing by 100
-        next_since = since + 100
+        # GitHub's 'since' is the ID of the last user seen, and IDs are not contiguous
+        next_since = users[-1].get('id', since + 100)
         return users, next_since
     except Exception as e:
-        print(f"[ERROR] Failed to parse JSON response: {e}")
-        print(f"[ERROR] Response text: {res.text[:500]}")
+        logger.error("Failed to parse JSON response: %s", e)
+        logger.error("Response text: %s", res.text[:500])
         return [], None
 
 def get_user_details(username):
     url = f"https://api.github.com/users/{username}"
-    res = safe_get(url)
+    res = safe_get(url, conditional=True)
     try:
-        return res.json()
+        return orjson.loads(res.content)
     except Exception as e:
-        print(f"[ERROR] Failed to parse JSON response for {username}: {e}")
+        logger.error("Failed to parse JSON response for %s: %s", username, e)
         return {}
 
-def get_email_from_commits(username):
-    repos_url = f"https://api.github.com/users/{username}/repos"
-    res = safe_get(repos_url)
-    
-    if res is None or res.status_code != 200:
-        return None, None
-    
-    try:
-        repos = res.json()
-    except Exception as e:
-        print(f"[ERROR] Failed to parse repos JSON for {username}: {e}")
-        return None, None
-    
-    if not isinstance(repos, list):
-        return None, None
+GITHUB_EMAIL_DOMAIN = "github.com"
 
-    def is_github_email(email: str) -> bool:
-        """Check if an email is a GitHub-generated email (should be rejected)."""
-        if not email:
-            return False  # Empty email is not a GitHub email
-        e = email.strip().lower()
-        # Check if domain ends with github.com (covers github.com + users.noreply.github.com, etc.)
-        return e.endswith("@github.com") or e.split("@")[-1].endswith("github.com")
+def is_github_email(email: str) -> bool:
+    """Check if an email is a GitHub-generated email (should be rejected)."""
+    if not email:
+        return False  # Empty email is not a GitHub email
+    # Lowercase only the domain; a suffix check covers github.com and users.noreply.github.com
+    domain = email.rpartition("@")[2].strip().lower()
+    return domain.endswith(GITHUB_EMAIL_DOMAIN)
 
-    for repo in repos[:5]:  # Limit to first 5 repos to avoid too many API calls
-        try:
-            repo_name = repo.get('name')
-            if not repo_name:
-                continue
+def _timezone_from_payload(payload: str) -> Optional[Tuple[str, str]]:
+    """
+    Extract the timezone from a signed commit payload in a single pass.
+    Returns (role, timezone) preferring the author line over the committer line, or None.
+    """
+    committer_tz = None
+    for match in TZ_RE.finditer(payload):
+        if match.group("role") == "author":
+            return "author", match.group("tz")
+        if committer_tz is None:
+            committer_tz = match.group("tz")
+    return ("committer", committer_tz) if committer_tz else None
 
-            commits_url = f"https://api.github.com/repos/{username}/{repo_name}/commits"
-            commits_res = safe_get(commits_url)
+GRAPHQL_URL = "https://api.github.com/graphql"
 
-            if commits_res is None or commits_res.status_code != 200:
-                continue
+# Latest pushed repos of a user with the head commits of their default branch,
+# i.e. everything get_email_from_commits/get_timezone_from_commits need in one request
+USER_COMMITS_QUERY = """
+query($login: String!, $repos: Int!, $commits: Int!) {
+  user(login: $login) {
+    repositories(first: $repos, ownerAffiliations: OWNER, orderBy: {field: PUSHED_AT, direction: DESC}) {
+      nodes {
+        name
+        defaultBranchRef {
+          target {
+            ... on Commit {
+              history(first: $commits) {
+                nodes {
+                  author { email name }
+                  committer { email name }
+                  signature { payload isValid }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
 
-            try:
-                commits = commits_res.json()
-            except Exception as e:
-                print(f"[ERROR] Failed to parse commits JSON for {username}/{repo_name}: {e}")
-                continue
+def get_user_commit_metadata(username) -> Optional[Tuple[Optional[str], Optional[str], Optional[str]]]:
+    """
+    Fetch a user's recent commits through the GraphQL API in a single round trip.
+    Returns (name, email, timezone) - each None if not found - or None if the query
+    failed or found no user (e.g. the login is an organization), in which case
+    callers use the REST API.
+    """
+    try:
+        return _query_user_commit_metadata(username)
+    except Exception as e:
+        logger.error("GraphQL commit lookup failed for %s: %s", username, e)
+        return None
 
-            if not isinstance(commits, list):
-                continue
+@lru_cache(maxsize=4096)
+def _query_user_commit_metadata(username) -> Optional[Tuple[Optional[str], Optional[str], Optional[str]]]:
+    """
+    Cached body of get_user_commit_metadata. Failed requests raise instead of
+    returning None, so they are not cached and the next lookup tries again.
+    """
+    variables = {"login": username, "repos": MAX_COMMIT_REPOS, "commits": 10}
+    res = safe_post(GRAPHQL_URL, json={"query": USER_COMMITS_QUERY, "variables": variables})
+    if res is None or res.status_code != 200:
+        raise Exception(f"GraphQL API returned status {getattr(res, 'status_code', None)}")
+    user = (orjson.loads(res.content).get("data") or {}).get("user")
 
-            for commit in commits[:10]:  # Check first 10 commits
-                try:
-                    author = commit.get("commit", {}).get("author", {}) or {}
-                    email = (author.get("email") or "").strip()
-                    name = (author.get("name") or "").strip()
+    if not user:
+        return None
 
-                    if email and "@" in email and not is_github_email(email):
-                        return name, email
-                except Exception:
-                    continue
+    name = email = timezone = None
+    for repo in filter(None, (user.get("repositories") or _EMPTY).get("nodes") or ()):
+        target = (repo.get("defaultBranchRef") or _EMPTY).get("target") or _EMPTY
+        for node in filter(None, (target.get("history") or _EMPTY).get("nodes") or ()):
+            if email is None:
+                author = node.get("author") or _EMPTY
+                author_email = (author.get("email") or "").strip()
+                if author_email and "@" in author_email and not is_github_email(author_email):
+                    name, email = (author.get("name") or "").strip(), author_email
 
-        except Exception as e:
-            print(f"[ERROR] Error checking commits for {username}/{repo.get('name', 'unknown')}: {e}")
-            continue
+            signature = node.get("signature") or _EMPTY
+            if timezone is None and signature.get("isValid") and signature.get("payload"):
+                found = _timezone_from_payload(signature["payload"])
+                if found:
+                    role, timezone = found
+                    logger.debug("Found %s timezone from verified commit for @%s/%s: %s", role, username, repo.get('name'), timezone)
 
-    return None, None
+            if email and timezone:
+                return name, email, timezone
 
+    return name, email, timezone
 
-def get_timezone_from_commits(username):
+def _get_user_repos(username) -> Optional[Tuple[dict, ...]]:
     """
-    Extract timezone from commit verification payloads.
-    Only checks commits where verification.verified == true.
-    Returns timezone in format [+-]HHMM (e.g., '+0300', '-0500') or None.
+    Fetch a user's repo list, cached so the email and timezone lookups share one request.
+    Returns a tuple of repo dicts, or None if the request or parsing failed.
     """
-    repos_url = f"https://api.github.com/users/{username}/repos"
-    res = safe_get(repos_url)
-    
+    try:
+        return _fetch_user_repos(username)
+    except Exception as e:
+        logger.error("Failed to fetch repos for %s: %s", username, e)
+        return None
+
+@lru_cache(maxsize=4096)
+def _fetch_user_repos(username) -> Tuple[dict, ...]:
+    """Cached body of _get_user_repos; raises on failure so failures aren't cached"""
+    res = safe_get(f"https://api.github.com/users/{username}/repos")
     if res is None or res.status_code != 200:
+        raise Exception(f"GitHub API returned status {getattr(res, 'status_code', None)}")
+
+    repos = orjson.loads(res.content)
+    if not isinstance(repos, list):
+        raise Exception(f"Unexpected repos response: {type(repos).__name__}")
+    return tuple(repos)
+
+def _fetch_commits(username, repo_name, per_page=None):
+    """Fetch the commit list of a repo. Returns the parsed JSON list or None."""
+    commits_url = f"https://api.github.com/repos/{username}/{repo_name}/commits"
+    if per_page:
+        commits_url += f"?per_page={per_page}"
+
+    try:
+        commits_res = safe_get(commits_url)
+    except Exception as e:
+        logger.error("Error fetching commits for %s/%s: %s", username, repo_name, e)
         return None
-    
+
+    if commits_res is None or commits_res.status_code != 200:
+        return None
+
     try:
-        repos = res.json()
+        commits = orjson.loads(commits_res.content)
     except Exception as e:
-        print(f"[ERROR] Failed to parse repos JSON for {username}: {e}")
+        logger.error("Failed to parse commits JSON for %s/%s: %s", username, repo_name, e)
         return None
-    
-    if not isinstance(repos, list):
+
+    return commits if isinstance(commits, list) else None
+
+def _iter_user_repos(username, repos, fetch, *args):
+    """
+    Run fetch(username, repo_name, *args) for the first MAX_COMMIT_REPOS repos concurrently.
+    Yields (repo_name, result) in repo order.
+    Fetches still pending when the caller stops iterating are cancelled.
+    """
+    repo_names = [
+        repo.get('name') for repo in repos[:MAX_COMMIT_REPOS]
+        if isinstance(repo, dict) and repo.get('name')
+    ]
+    futures = [_commit_pool.submit(fetch, username, name, *args) for name in repo_names]
+    try:
+        for repo_name, future in zip(repo_names, futures):
+            yield repo_name, future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+def _first_commit_email(authors):
+    """Get (name, email) of the first commit author with a non-GitHub email, or None"""
+    for author in authors:
+        if not isinstance(author, dict):
+            continue
+        email = (author.get("email") or "").strip()
+        if email and "@" in email and not is_github_email(email):
+            return (author.get("name") or "").strip(), email
+    return None
+
+def _find_commit_email(username, repo_name):
+    """
+    Find a non-GitHub author email in the latest 10 commits of a repo.
+    With ijson installed the commit list is parsed as it streams in and the
+    download is dropped as soon as an email is found. Returns (name, email) or None.
+    """
+    if ijson is None:
+        commits = _fetch_commits(username, repo_name, per_page=10) or []
+        return _first_commit_email(
+            (commit.get("commit") or _EMPTY).get("author") for commit in commits if isinstance(commit, dict)
+        )
+
+    commits_url = f"https://api.github.com/repos/{username}/{repo_name}/commits?per_page=10"
+    try:
+        res = safe_get(commits_url, stream=True)
+        if res is None or res.status_code != 200:
+            return None
+        with res:
+            res.raw.decode_content = True
+            return _first_commit_email(ijson.items(res.raw, "item.commit.author"))
+    except Exception as e:
+        logger.error("Error checking commits for %s/%s: %s", username, repo_name, e)
         return None
 
-    # Regex patterns for extracting timezone from payload
-    author_tz_pattern = re.compile(r'^author .*? \d+ ([+-]\d{4})$', re.MULTILINE)
-    committer_tz_pattern = re.compile(r'^committer .*? \d+ ([+-]\d{4})$', re.MULTILINE)
+def get_email_from_commits(username):
+    """Find a non-GitHub commit email for a user. Returns (name, email) or (None, None)."""
+    metadata = get_user_commit_metadata(username)
+    if metadata is not None:
+        name, email, _ = metadata
+        return (name, email) if email else (None, None)
+    return _get_email_from_rest_commits(username)
 
-    for repo in repos[:5]:  # Limit to first 5 repos to avoid too many API calls
-        try:
-            repo_name = repo.get('name')
-            if not repo_name:
-                continue
+def _get_email_from_rest_commits(username):
+    repos = _get_user_repos(username)
+    if repos is None:
+        return None, None
 
-            commits_url = f"https://api.github.com/repos/{username}/{repo_name}/commits?per_page=10"
-            commits_res = safe_get(commits_url)
+    for repo_name, found in _iter_user_repos(username, repos, _find_commit_email):
+        if found:
+            return found
 
-            if commits_res is None or commits_res.status_code != 200:
-                continue
+    return None, None
 
-            try:
-                commits = commits_res.json()
-            except Exception as e:
-                print(f"[ERROR] Failed to parse commits JSON for {username}/{repo_name}: {e}")
-                continue
 
-            if not isinstance(commits, list):
-                continue
+def get_timezone_from_commits(username):
+    """
+    Extract timezone from commit verification payloads.
+    Only checks commits where verification.verified == true.
+    Returns timezone in format [+-]HHMM (e.g., '+0300', '-0500') or None.
+    """
+    metadata = get_user_commit_metadata(username)
+    if metadata is not None:
+        return metadata[2]
+    return _get_timezone_from_rest_commits(username)
 
-            for commit in commits:
-                try:
-                    # Only check verified commits
-                    verification = commit.get("verification", {}) or {}
-                    if not verification.get("verified", False):
-                        continue
-                    
-                    # Extract payload from verification
-                    payload = verification.get("payload", "")
-                    if not payload:
-                        continue
-                    
-                    # Try to extract author timezone first (preferred)
-                    author_match = author_tz_pattern.search(payload)
-                    if author_match:
-                        timezone = author_match.group(1)
-                        print(f"[INFO] Found author timezone from verified commit for @{username}/{repo_name}: {timezone}")
-                        return timezone
-                    
-                    # Fallback to committer timezone
-                    committer_match = committer_tz_pattern.search(payload)
-                    if committer_match:
-                        timezone = committer_match.group(1)
-                        print(f"[INFO] Found committer timezone from verified commit for @{username}/{repo_name}: {timezone}")
-                        return timezone
-                        
-                except Exception as e:
-                    # Silently continue to next commit
-                    continue
+def _get_timezone_from_rest_commits(username):
+    repos = _get_user_repos(username)
+    if repos is None:
+        return None
 
-        except Exception as e:
-            print(f"[ERROR] Error checking commits for timezone for {username}/{repo.get('name', 'unknown')}: {e}")
+    for repo_name, commits in _iter_user_repos(username, repos, _fetch_commits, 10):
+        if not commits:
             continue
 
+        for commit in commits:
+            try:
+                # Only check verified commits
+                verification = commit.get("verification") or _EMPTY
+                if not verification.get("verified", False):
+                    continue
+                
+                # Extract payload from verification
+                payload = verification.get("payload", "")
+                if not payload:
+                    continue
+                
+                # Author timezone is preferred, committer timezone is the fallback
+                found = _timezone_from_payload(payload)
+                if found:
+                    role, timezone = found
+                    logger.debug("Found %s timezone from verified commit for @%s/%s: %s", role, username, repo_name, timezone)
+                    return timezone
+
+            except Exception as e:
+                # Silently continue to next commit
+                continue
+
     return None
@@ -1,10 +1,23 @@
 import os
+import logging
+import time
+import asyncio
 import httpx
+import orjson
+from aiolimiter import AsyncLimiter
+from collections import OrderedDict
 from dotenv import load_dotenv
 import re
 
+try:
+    import ahocorasick  # pyahocorasick
+except ImportError:  # fall back to a precompiled regex alternation
+    ahocorasick = None
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Provider selection: "opencage", "google", "nominatim", "claude", "gemini", "groq"
 LOCATION_PROVIDER = os.getenv("LOCATION_PROVIDER", "nominatim").lower()
 
@@ -15,8 +28,86 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
+# Shared HTTP client for geocoding/LLM calls, created on first use so it binds
+# to the running event loop; keeps connections (and TLS sessions) alive across users
+_CLIENT: httpx.AsyncClient | None = None
+
+
+async def _client() -> httpx.AsyncClient:
+    """Get the shared AsyncClient, creating it on first use"""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            timeout=10,
+        )
+    return _CLIENT
+
+
+async def close_client():
+    """Close the shared AsyncClient (called on application shutdown)"""
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
+
+# Nominatim's usage policy allows at most 1 request per second
+_NOMINATIM_LIMITER = AsyncLimiter(1, 1)
+
+
+# Geocoding results cached per (provider, lowercased location) - many users
+# share the same location, so most lookups never need to hit the API.
+# Negative results (provider answered, no match) are cached too; failed
+# requests (errors, timeouts, 429/5xx) are not, so they are retried later.
+GEOCODE_CACHE_TTL = 24 * 60 * 60  # seconds
+GEOCODE_CACHE_SIZE = 4096
+_GEOCODE_CACHE: OrderedDict = OrderedDict()  # key -> (stored_at, (country_code | None, is_iran))
+_MISS = object()
+_FAILED = object()  # geocoder request failed, as opposed to None for "no match"
+
+
+def _cache_get(cache: OrderedDict, key):
+    """Get a cached value (marking it recently used), or _MISS if absent or expired"""
+    entry = cache.get(key)
+    if entry is None:
+        return _MISS
+    stored_at, value = entry
+    if time.monotonic() - stored_at > GEOCODE_CACHE_TTL:
+        del cache[key]
+        return _MISS
+    cache.move_to_end(key)
+    return value
+
+
+def _cache_put(cache: OrderedDict, key, value):
+    """Store a value, evicting the least recently used entry when full"""
+    cache[key] = (time.monotonic(), value)
+    cache.move_to_end(key)
+    if len(cache) > GEOCODE_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+# Lookups currently running, keyed like the caches. Users in the same batch often
+# share a location; concurrent misses for it wait on one request instead of each
+# calling the provider before the first result is cached.
+_INFLIGHT: dict = {}
+
+
+async def _single_flight(key, lookup):
+    """Run lookup() once per key among concurrent callers and share its result"""
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(lookup())
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+    # Shielded so one cancelled caller doesn't cancel the lookup the others await
+    return await asyncio.shield(task)
+
+
 # Iran province/territory names and common Iran location keywords
-US_STATES = {
+US_STATES = frozenset({
     'alborz',
     'ardabil',
     'bushehr',
@@ -48,9 +139,9 @@ US_STATES = {
     'west azerbaijan', 'west azarbaijan',
     'yazd',
     'zanjan',
-}
+})
 
-US_STATE_CODES = {
+US_STATE_CODES = frozenset({
     'alb',  # alborz
     'ard',  # ardabil
     'bsh',  # bushehr
@@ -82,124 +173,232 @@ US_STATE_CODES = {
     'waz',  # west azerbaijan
     'yaz',  # yazd
     'zan',  # zanjan
-}
+})
 
-US_KEYWORDS = {
+US_KEYWORDS = frozenset({
     'iran',
     'ir', 'i.r.', 'i.r',               # common abbreviation for "Islamic Republic"
     'islamic republic of iran',
     'persia', 'persian',
     'tehran',
     'iranian',
-}
+})
+
+# All Iran terms (keywords, province names and codes) matched in one pass over
+# the location, as whole words/phrases so 'iran' matches but 'irrational' doesn't
+_IRAN_TERMS = US_KEYWORDS | US_STATES | US_STATE_CODES
+
+if ahocorasick is not None:
+    _IRAN_AUTOMATON = ahocorasick.Automaton()
+    for _term in _IRAN_TERMS:
+        _IRAN_AUTOMATON.add_word(_term, _term)
+    _IRAN_AUTOMATON.make_automaton()
+else:
+    _IRAN_AUTOMATON = None
+    _IRAN_TERMS_RE = re.compile(
+        r'(?<!\w)(?:' + '|'.join(re.escape(t) for t in sorted(_IRAN_TERMS, key=len, reverse=True)) + r')(?!\w)'
+    )
+
+
+def _is_word_char(ch: str) -> bool:
+    """Same character class as regex \\w"""
+    return ch.isalnum() or ch == "_"
+
+
+def _find_iran_term(location_lower: str) -> str | None:
+    """Find the first Iran term occurring as a whole word/phrase in a lowercased location"""
+    if _IRAN_AUTOMATON is None:
+        match = _IRAN_TERMS_RE.search(location_lower)
+        return match.group() if match else None
+    
+    last = len(location_lower) - 1
+    for end, term in _IRAN_AUTOMATON.iter(location_lower):
+        start = end - len(term) + 1
+        if (start == 0 or not _is_word_char(location_lower[start - 1])) and \
+                (end == last or not _is_word_char(location_lower[end + 1])):
+            return term
+    return None
+
+
+def _iran_shortcircuit(location_lower: str) -> bool:
+    """Quick check for Iran keywords and province names/codes in a lowercased location"""
+    return _find_iran_term(location_lower) is not None
+
+
+# Profile locations longer than this are bios/jokes rather than places
+MAX_LOCATION_LENGTH = 100
+# At least one run of 2+ letters in any script ("Tokyo", "東京", "Москва"), so
+# "-", "???", "123" and lone emoji never reach a provider
+_LETTERS_RE = re.compile(r'[^\W\d_]{2,}')
+_NON_LOCATIONS = frozenset({'null', 'none', 'nil', 'undefined', 'unknown', 'n/a', 'nowhere', 'localhost'})
+
+
+def _normalize_location(location_str: str) -> str:
+    """Strip and collapse whitespace so equivalent locations share a cache key"""
+    return " ".join(location_str.split()) if location_str else ""
+
+
+def _is_geocodable(location_lower: str) -> bool:
+    """Cheap filter for obvious non-geographic profile noise before any API call"""
+    return (
+        len(location_lower) <= MAX_LOCATION_LENGTH
+        and location_lower not in _NON_LOCATIONS
+        and _LETTERS_RE.search(location_lower) is not None
+    )
 
 
 async def is_us_location_geocoding(location_str: str) -> bool:
     """Check if location is in Iran using geocoding APIs"""
+    _, is_iran = await _resolve(location_str, retries=1)
+    return is_iran
+
+
+async def _resolve(location_str: str, retries=2) -> tuple[str | None, bool]:
+    """
+    Resolve a location to (uppercase country code or None, is_iran).
+    Both answers come from the same geocoder response and are cached together,
+    so asking for the country code and the Iran check costs one API call.
+    """
+    location_str = _normalize_location(location_str)
     if not location_str:
-        return False
+        return None, False
     
     location_lower = location_str.lower()
     
-    # Quick keyword check first
-    if any(keyword in location_lower for keyword in US_KEYWORDS):
-        return True
+    # Quick check for Iran keywords and province names/codes
+    if _iran_shortcircuit(location_lower):
+        return "", True
     
-    # Check for Iran province/territory names or codes
-    words = re.findall(r'\b\w+\b', location_lower)
-    if any(word in US_STATES or word in US_STATE_CODES for word in words):
-        return True
+    if not _is_geocodable(location_lower):
+        return None, False
     
-    # Use geocoding API
+    cache_key = (LOCATION_PROVIDER, location_lower)
+    cached = _cache_get(_GEOCODE_CACHE, cache_key)
+    if cached is not _MISS:
+        return cached
+    
+    async def lookup():
+        for _ in range(retries):
+            country_code = await _geocode(location_str)
+            if country_code is not _FAILED:
+                break
+        else:
+            # Every attempt failed - answer "unknown" without caching it
+            return None, False
+        
+        if country_code is None:
+            result = (None, False)
+        else:
+            result = (country_code.upper() or None, country_code.lower() == "")
+        _cache_put(_GEOCODE_CACHE, cache_key, result)
+        return result
+    
+    return await _single_flight(cache_key, lookup)
+
+
+async def _geocode(location_str: str):
+    """
+    Get the raw country code of the best match from the configured geocoder.
+    Returns None if the provider found no match, or _FAILED if the request failed.
+    """
     if LOCATION_PROVIDER == "opencage":
-        return await _check_with_opencage(location_str)
+        return await _geocode_opencage(location_str)
     elif LOCATION_PROVIDER == "google":
-        return await _check_with_google(location_str)
-    elif LOCATION_PROVIDER == "nominatim":
-        return await _check_with_nominatim(location_str)
-    
-    return False
+        return await _geocode_google(location_str)
+    # Nominatim is the default, and the geocoder behind the LLM providers
+    return await _geocode_nominatim(location_str)
 
 
-async def _check_with_nominatim(location_str: str) -> bool:
-    """Check location using Nominatim (OpenStreetMap) - FREE"""
+async def _geocode_nominatim(location_str: str):
+    """Geocode using Nominatim (OpenStreetMap) - FREE"""
     try:
-        async with httpx.AsyncClient() as client:
-            url = "https://nominatim.openstreetmap.org/search"
-            params = {
-                "q": location_str,
-                "format": "json",
-                "addressdetails": 1,
-                "limit": 1
-            }
-            headers = {
-                "User-Agent": "GitHub-User-Bot/1.0"  # Required by Nominatim
-            }
-            
+        client = await _client()
+        url = "https://nominatim.openstreetmap.org/search"
+        params = {
+            "q": location_str,
+            "format": "json",
+            "addressdetails": 1,
+            "limit": 1
+        }
+        headers = {
+            "User-Agent": "GitHub-User-Bot/1.0"  # Required by Nominatim
+        }
+        
+        async with _NOMINATIM_LIMITER:
             res = await client.get(url, params=params, headers=headers, timeout=10)
-            if res.status_code == 200:
-                data = res.json()
-                if data and len(data) > 0:
-                    address = data[0].get("address", {})
-                    country_code = address.get("country_code", "").lower()
-                    return country_code == ""
+        if res.status_code != 200:
+            logger.warning("Nominatim returned status %s", res.status_code)
+            return _FAILED
+        data = orjson.loads(res.content)
+        if data and len(data) > 0:
+            address = data[0].get("address", {})
+            return address.get("country_code", "")
+        return None
     except Exception as e:
-        print(f"[Nominatim Error] {e}")
-    return False
+        logger.error("Nominatim error: %s", e)
+    return _FAILED
 
 
-async def _check_with_opencage(location_str: str) -> bool:
-    """Check location using OpenCage Geocoding API"""
+async def _geocode_opencage(location_str: str):
+    """Geocode using OpenCage Geocoding API"""
     if not OPENCAGE_API_KEY:
-        print("[ERROR] OPENCAGE_API_KEY not set")
-        return False
+        logger.error("OPENCAGE_API_KEY not set")
+        return _FAILED
     
     try:
-        async with httpx.AsyncClient() as client:
-            url = "https://api.opencagedata.com/geocode/v1/json"
-            params = {
-                "q": location_str,
-                "key": OPENCAGE_API_KEY,
-                "limit": 1
-            }
-            
-            res = await client.get(url, params=params, timeout=10)
-            if res.status_code == 200:
-                data = res.json()
-                if data.get("results"):
-                    country_code = data["results"][0].get("components", {}).get("country_code", "").lower()
-                    return country_code == ""
+        client = await _client()
+        url = "https://api.opencagedata.com/geocode/v1/json"
+        params = {
+            "q": location_str,
+            "key": OPENCAGE_API_KEY,
+            "limit": 1
+        }
+        
+        res = await client.get(url, params=params, timeout=10)
+        if res.status_code != 200:
+            logger.warning("OpenCage returned status %s", res.status_code)
+            return _FAILED
+        data = orjson.loads(res.content)
+        if data.get("results"):
+            return data["results"][0].get("components", {}).get("country_code", "")
+        return None
     except Exception as e:
-        print(f"[OpenCage Error] {e}")
-    return False
+        logger.error("OpenCage error: %s", e)
+    return _FAILED
 
 
-async def _check_with_google(location_str: str) -> bool:
-    """Check location using Google Maps Geocoding API"""
+async def _geocode_google(location_str: str):
+    """Geocode using Google Maps Geocoding API"""
     if not GOOGLE_MAPS_API_KEY:
-        print("[ERROR] GOOGLE_MAPS_API_KEY not set")
-        return False
+        logger.error("GOOGLE_MAPS_API_KEY not set")
+        return _FAILED
     
     try:
-        async with httpx.AsyncClient() as client:
-            url = "https://maps.googleapis.com/maps/api/geocode/json"
-            params = {
-                "address": location_str,
-                "key": GOOGLE_MAPS_API_KEY
-            }
-            
-            res = await client.get(url, params=params, timeout=10)
-            if res.status_code == 200:
-                data = res.json()
-                if data.get("results"):
-                    address_components = data["results"][0].get("address_components", [])
-                    for component in address_components:
-                        if "country" in component.get("types", []):
-                            country_code = component.get("short_name", "").lower()
-                            return country_code == ""
+        client = await _client()
+        url = "https://maps.googleapis.com/maps/api/geocode/json"
+        params = {
+            "address": location_str,
+            "key": GOOGLE_MAPS_API_KEY
+        }
+        
+        res = await client.get(url, params=params, timeout=10)
+        if res.status_code != 200:
+            logger.warning("Google Maps returned status %s", res.status_code)
+            return _FAILED
+        data = orjson.loads(res.content)
+        # Quota/permission errors still come back as HTTP 200 with an error status
+        if data.get("status") not in ("OK", "ZERO_RESULTS"):
+            logger.warning("Google Maps returned status %s", data.get("status"))
+            return _FAILED
+        if data.get("results"):
+            address_components = data["results"][0].get("address_components", [])
+            for component in address_components:
+                if "country" in component.get("types", []):
+                    return component.get("short_name", "")
+        return None
     except Exception as e:
-        print(f"[Google Maps Error] {e}")
-    return False
+        logger.error("Google Maps error: %s", e)
+    return _FAILED
 
 
 async def is_us_location_llm(location_str: str) -> bool:
@@ -207,10 +406,8 @@ async def is_us_location_llm(location_str: str) -> bool:
     if not location_str:
         return False
     
-    prompt = (
-        f"Given the user's location: '{location_str}', determine whether they are located in Iran. "
-        "Respond only with 'Yes' or 'No'."
-    )
+    # Single-letter answer so every provider can stop after one output token
+    prompt = f"Is this location in Iran? Answer Y or N.\n{location_str}"
     
     if LOCATION_PROVIDER == "claude":
         return await _check_with_claude(prompt)
@@ -225,85 +422,88 @@ async def is_us_location_llm(location_str: str) -> bool:
 async def _check_with_claude(prompt: str) -> bool:
     """Check location using Anthropic Claude API"""
     if not ANTHROPIC_API_KEY:
-        print("[ERROR] ANTHROPIC_API_KEY not set")
+        logger.error("ANTHROPIC_API_KEY not set")
         return False
     
     try:
-        async with httpx.AsyncClient() as client:
-            url = "https://api.anthropic.com/v1/messages"
-            headers = {
-                "x-api-key": ANTHROPIC_API_KEY,
-                "anthropic-version": "2023-06-01",
-                "Content-Type": "application/json"
-            }
-            body = {
-                "model": "claude-3-haiku-20240307",
-                "max_tokens": 10,
-                "messages": [{"role": "user", "content": prompt}]
-            }
-            
-            res = await client.post(url, headers=headers, json=body, timeout=30)
-            if res.status_code == 200:
-                data = res.json()
-                answer = data.get("content", [{}])[0].get("text", "").strip().lower()
-                return answer.startswith("yes")
+        client = await _client()
+        url = "https://api.anthropic.com/v1/messages"
+        headers = {
+            "x-api-key": ANTHROPIC_API_KEY,
+            "anthropic-version": "2023-06-01",
+            "Content-Type": "application/json"
+        }
+        body = {
+            "model": "claude-3-haiku-20240307",
+            "max_tokens": 1,
+            "temperature": 0,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        
+        res = await client.post(url, headers=headers, json=body, timeout=30)
+        if res.status_code == 200:
+            data = orjson.loads(res.content)
+            answer = data.get("content", [{}])[0].get("text", "").strip().lower()
+            return answer.startswith("y")
     except Exception as e:
-        print(f"[Claude Error] {e}")
+        logger.error("Claude error: %s", e)
     return False
 
 
 async def _check_with_gemini(prompt: str) -> bool:
     """Check location using Google Gemini API"""
     if not GEMINI_API_KEY:
-        print("[ERROR] GEMINI_API_KEY not set")
+        logger.error("GEMINI_API_KEY not set")
         return False
     
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={GEMINI_API_KEY}"
-            body = {
-                "contents": [{
-                    "parts": [{"text": prompt}]
-                }]
-            }
-            
-            res = await client.post(url, json=body, timeout=30)
-            if res.status_code == 200:
-                data = res.json()
-                answer = data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "").strip().lower()
-                return answer.startswith("yes")
+        client = await _client()
+        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={GEMINI_API_KEY}"
+        body = {
+            "contents": [{
+                "parts": [{"text": prompt}]
+            }],
+            "generationConfig": {"maxOutputTokens": 1, "temperature": 0}
+        }
+        
+        res = await client.post(url, json=body, timeout=30)
+        if res.status_code == 200:
+            data = orjson.loads(res.content)
+            answer = data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "").strip().lower()
+            return answer.startswith("y")
     except Exception as e:
-        print(f"[Gemini Error] {e}")
+        logger.error("Gemini error: %s", e)
     return False
 
 
 async def _check_with_groq(prompt: str) -> bool:
     """Check location using Groq API"""
     if not GROQ_API_KEY:
-        print("[ERROR] GROQ_API_KEY not set")
+        logger.error("GROQ_API_KEY not set")
         return False
     
     try:
-        async with httpx.AsyncClient() as client:
-            url = "https://api.groq.com/openai/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json"
-            }
-            body = {
-                "model": "llama-3.1-8b-instant",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0,
-                "max_tokens": 10
-            }
-            
-            res = await client.post(url, headers=headers, json=body, timeout=30)
-            if res.status_code == 200:
-                data = res.json()
-                answer = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip().lower()
-                return answer.startswith("yes")
+        client = await _client()
+        url = "https://api.groq.com/openai/v1/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {GROQ_API_KEY}",
+            "Content-Type": "application/json"
+        }
+        body = {
+            "model": "llama-3.1-8b-instant",
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0,
+            "max_tokens": 1,
+            "stop": ["\n"]
+        }
+        
+        res = await client.post(url, headers=headers, json=body, timeout=30)
+        if res.status_code == 200:
+            data = orjson.loads(res.content)
+            answer = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip().lower()
+            return answer.startswith("y")
     except Exception as e:
-        print(f"[Groq Error] {e}")
+        logger.error("Groq error: %s", e)
     return False
 
 
@@ -320,16 +520,18 @@ async def is_us_location(location_str: str, retries=2) -> bool:
     - "gemini" - Google Gemini API
     - "groq" - Groq API
     """
+    location_str = _normalize_location(location_str)
     if not location_str:
         return False
     
+    location_lower = location_str.lower()
+    if not _iran_shortcircuit(location_lower) and not _is_geocodable(location_lower):
+        return False
+    
     # Use geocoding APIs (recommended)
     if LOCATION_PROVIDER in ["nominatim", "opencage", "google"]:
-        for _ in range(retries):
-            result = await is_us_location_geocoding(location_str)
-            if result:
-                return True
-        return False
+        _, is_iran = await _resolve(location_str, retries)
+        return is_iran
     
     # Use LLM providers
     elif LOCATION_PROVIDER in ["claude", "gemini", "groq"]:
@@ -340,10 +542,11 @@ async def is_us_location(location_str: str, retries=2) -> bool:
         return False
     
     else:
-        print(f"[ERROR] Unknown LOCATION_PROVIDER: {LOCATION_PROVIDER}")
-        print(f"[INFO] Using default: nominatim")
+        logger.error("Unknown LOCATION_PROVIDER: %s", LOCATION_PROVIDER)
+        logger.info("Using default: nominatim")
         # Fallback to nominatim
-        return await _check_with_nominatim(location_str)
+        _, is_iran = await _resolve(location_str, retries)
+        return is_iran
 
 
 async def get_country_code(location_str: str, retries=2) -> str:
@@ -352,135 +555,8 @@ async def get_country_code(location_str: str, retries=2) -> str:
     Returns uppercase country code (e.g., 'PK', 'US', 'NO') or None if not found.
     Supports multiple providers configured via LOCATION_PROVIDER env var.
     """
-    if not location_str:
-        return None
-    
-    location_lower = location_str.lower()
-    
-    # Quick keyword check for Iran
-    if any(keyword in location_lower for keyword in US_KEYWORDS):
-        return ""
-    
-    # Check for Iran province/territory names or codes
-    words = re.findall(r'\b\w+\b', location_lower)
-    if any(word in US_STATES or word in US_STATE_CODES for word in words):
-        return ""
-    
-    # Use geocoding APIs (recommended)
-    if LOCATION_PROVIDER in ["nominatim", "opencage", "google"]:
-        for _ in range(retries):
-            country_code = await _get_country_code_geocoding(location_str)
-            if country_code:
-                return country_code.upper()
-        return None
-    
-    # Use LLM providers (fallback - less reliable for country codes)
-    elif LOCATION_PROVIDER in ["claude", "gemini", "groq"]:
-        # For LLM, we'll use geocoding as fallback
-        for _ in range(retries):
-            country_code = await _get_country_code_geocoding(location_str)
-            if country_code:
-                return country_code.upper()
-        return None
-    
-    else:
-        print(f"[ERROR] Unknown LOCATION_PROVIDER: {LOCATION_PROVIDER}")
-        print(f"[INFO] Using default: nominatim")
-        # Fallback to nominatim
-        country_code = await _get_country_code_nominatim(location_str)
-        return country_code.upper() if country_code else None
-
-
-async def _get_country_code_geocoding(location_str: str) -> str:
-    """Get country code using geocoding APIs"""
-    if LOCATION_PROVIDER == "opencage":
-        return await _get_country_code_opencage(location_str)
-    elif LOCATION_PROVIDER == "google":
-        return await _get_country_code_google(location_str)
-    elif LOCATION_PROVIDER == "nominatim":
-        return await _get_country_code_nominatim(location_str)
-    return None
-
-
-async def _get_country_code_nominatim(location_str: str) -> str:
-    """Get country code using Nominatim (OpenStreetMap) - FREE"""
-    try:
-        async with httpx.AsyncClient() as client:
-            url = "https://nominatim.openstreetmap.org/search"
-            params = {
-                "q": location_str,
-                "format": "json",
-                "addressdetails": 1,
-                "limit": 1
-            }
-            headers = {
-                "User-Agent": "GitHub-User-Bot/1.0"  # Required by Nominatim
-            }
-            
-            res = await client.get(url, params=params, headers=headers, timeout=10)
-            if res.status_code == 200:
-                data = res.json()
-                if data and len(data) > 0:
-                    address = data[0].get("address", {})
-                    country_code = address.get("country_code", "")
-                    return country_code if country_code else None
-    except Exception as e:
-        print(f"[Nominatim Error] {e}")
-    return None
-
-
-async def _get_country_code_opencage(location_str: str) -> str:
-    """Get country code using OpenCage Geocoding API"""
-    if not OPENCAGE_API_KEY:
-        print("[ERROR] OPENCAGE_API_KEY not set")
-        return None
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            url = "https://api.opencagedata.com/geocode/v1/json"
-            params = {
-                "q": location_str,
-                "key": OPENCAGE_API_KEY,
-                "limit": 1
-            }
-            
-            res = await client.get(url, params=params, timeout=10)
-            if res.status_code == 200:
-                data = res.json()
-                if data.get("results"):
-                    country_code = data["results"][0].get("components", {}).get("country_code", "")
-                    return country_code if country_code else None
-    except Exception as e:
-        print(f"[OpenCage Error] {e}")
-    return None
-
-
-async def _get_country_code_google(location_str: str) -> str:
-    """Get country code using Google Maps Geocoding API"""
-    if not GOOGLE_MAPS_API_KEY:
-        print("[ERROR] GOOGLE_MAPS_API_KEY not set")
-        return None
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            url = "https://maps.googleapis.com/maps/api/geocode/json"
-            params = {
-                "address": location_str,
-                "key": GOOGLE_MAPS_API_KEY
-            }
-            
-            res = await client.get(url, params=params, timeout=10)
-            if res.status_code == 200:
-                data = res.json()
-                if data.get("results"):
-                    address_components = data["results"][0].get("address_components", [])
-                    for component in address_components:
-                        if "country" in component.get("types", []):
-                            country_code = component.get("short_name", "")
-                            return country_code if country_code else None
-    except Exception as e:
-        print(f"[Google Maps Error] {e}")
-    return None
+    country_code, _ = await _resolve(location_str, retries)
+    return country_code
 
 
 def get_country_from_timezone(timezone_offset: str) -> str:
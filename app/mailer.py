@@ -1,24 +1,66 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-import time
+import smtplib
 import os
+import atexit
+from threading import Lock
+from email.message import EmailMessage
 from dotenv import load_dotenv
 
 load_dotenv()
-CHROME_PROFILE_PATH = os.getenv("CHROME_PROFILE_PATH")
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")  # Gmail: an app password, not the account password
+SMTP_FROM = os.getenv("SMTP_FROM") or SMTP_USERNAME  # sender address, defaults to the login
+
+# One authenticated connection is reused across send_email calls
+_smtp = None
+_smtp_lock = Lock()
+
+
+def _connect():
+    """Open and authenticate a new SMTP connection (STARTTLS)"""
+    smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+    smtp.starttls()
+    if SMTP_USERNAME:
+        smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
+    return smtp
 
-def send_email(to_email, subject, body):
-    options = webdriver.ChromeOptions()
-    options.add_argument(f"user-data-dir={CHROME_PROFILE_PATH}")
-    driver = webdriver.Chrome(options=options)
 
-    driver.get("https://mail.google.com/mail/u/0/#inbox?compose=new")
-    time.sleep(5)
+def close():
+    """Close the shared SMTP connection, if open"""
+    global _smtp
+    with _smtp_lock:
+        if _smtp is not None:
+            try:
+                _smtp.quit()
+            except OSError:  # includes SMTPException; the connection may already be gone
+                pass
+            _smtp = None
 
-    driver.find_element(By.NAME, "to").send_keys(to_email)
-    driver.find_element(By.NAME, "subjectbox").send_keys(subject)
-    driver.find_element(By.CSS_SELECTOR, "div[aria-label='Message Body']").send_keys(body)
-    driver.find_element(By.XPATH, "//div[text()='Send']").click()
 
-    time.sleep(3)
-    driver.quit()
+atexit.register(close)
+
+
+def send_email(to_email, subject, body):
+    global _smtp
+    if not SMTP_FROM:
+        raise ValueError(
+            "No sender address! Please set SMTP_FROM (or SMTP_USERNAME) in your .env file."
+        )
+    
+    msg = EmailMessage()
+    msg["From"] = SMTP_FROM
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    msg.set_content(body)
+
+    with _smtp_lock:
+        try:
+            if _smtp is None:
+                _smtp = _connect()
+            _smtp.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # Server dropped the idle connection - reconnect once and resend
+            _smtp = None
+            _smtp = _connect()
+            _smtp.send_message(msg)
@@ -1,36 +1,127 @@
 from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 from . import models, schemas
 from . import github, gpt_location
 from .database import get_db, engine, SessionLocal
 import asyncio
-import traceback
-from typing import List
+import os
+import logging
+import orjson
+
+# Log level via LOG_LEVEL (e.g. DEBUG for per-user progress lines)
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
 
 models.Base.metadata.create_all(bind=engine)
 
+# Maximum number of users processed concurrently within a batch (MAX_CONCURRENCY env var)
+MAX_CONCURRENCY = github.MAX_CONCURRENCY
+
 app = FastAPI()
 
 
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Close the shared geocoding HTTP client"""
+    await gpt_location.close_client()
+
+
 def get_saved_since_value(db_session):
-    """Get saved 'since' value from database, or return 0 if not found"""
+    """Get saved 'since' value from database, creating the state row (at 0) if not found"""
     state = db_session.query(models.FetchState).filter(models.FetchState.key == "github_since").first()
-    if state:
-        return state.since_value
-    return 0
+    if state is None:
+        state = models.FetchState(key="github_since", since_value=0)
+        db_session.add(state)
+        db_session.commit()
+        return 0
+    return state.since_value
 
 
 def save_since_value(db_session, since_value):
-    """Save 'since' value to database"""
-    state = db_session.query(models.FetchState).filter(models.FetchState.key == "github_since").first()
-    if state:
-        state.since_value = since_value
-    else:
-        state = models.FetchState(key="github_since", since_value=since_value)
-        db_session.add(state)
+    """Save 'since' value to database (the row exists once loaded, so a single UPDATE)"""
+    db_session.execute(
+        update(models.FetchState)
+        .where(models.FetchState.key == "github_since")
+        .values(since_value=since_value)
+    )
     db_session.commit()
-    print(f"[INFO] Saved since value: {since_value}")
+    logger.info("Saved since value: %s", since_value)
+
+
+def _insert_users(rows):
+    """INSERT for user rows, skipping existing git_usernames and returning the inserted ones"""
+    return (
+        insert(models.User)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["git_username"])
+        .returning(models.User.git_username)
+    )
+
+
+def save_new_users(db_session, rows):
+    """
+    Insert a batch of user rows with a single statement and commit.
+    Users already stored (same git_username or email) are skipped. If the batch
+    fails on a bad row, rows are retried individually and only the bad ones skipped.
+    Returns the rows that were actually inserted.
+    """
+    if not rows:
+        return []
+    
+    try:
+        # Emails are not unique in the schema, so filter them up front (one query per batch)
+        existing_emails = set(db_session.execute(
+            select(models.User.email).where(models.User.email.in_({row["email"] for row in rows}))
+        ).scalars())
+        
+        new_rows = []
+        for row in rows:
+            if row["email"] in existing_emails:
+                logger.debug("[Skip] User @%s (email: %s) already exists in database", row['git_username'], row['email'])
+                continue
+            existing_emails.add(row["email"])
+            new_rows.append(row)
+        
+        if not new_rows:
+            return []
+        
+        # git_username is unique: existing users are skipped by the database itself
+        failed = set()
+        try:
+            inserted = set(db_session.execute(_insert_users(new_rows)).scalars())
+        except (DBAPIError, ValueError) as e:
+            # Any other bad row (too long, other unique column, or a NUL byte, which
+            # psycopg2 rejects client-side with ValueError) fails the whole statement;
+            # retry row by row so only the offending rows are lost
+            db_session.rollback()
+            logger.warning("Batch insert of %s users failed, retrying one by one: %s", len(new_rows), e)
+            inserted = set()
+            for row in new_rows:
+                try:
+                    with db_session.begin_nested():
+                        inserted.update(db_session.execute(_insert_users([row])).scalars())
+                except (DBAPIError, ValueError) as e:
+                    logger.error("Failed to save user @%s, skipping: %s", row['git_username'], e)
+                    failed.add(row["git_username"])
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+    
+    saved = []
+    for row in new_rows:
+        if row["git_username"] in inserted:
+            saved.append(row)
+        elif row["git_username"] not in failed:
+            logger.debug("[Skip] User @%s (email: %s) already exists in database", row['git_username'], row['email'])
+    return saved
 
 
 @app.get("/git_users")
@@ -50,18 +141,18 @@ async def run():
     try:
         # Load saved 'since' value from database
         since = get_saved_since_value(db_session)
-        print(f"[INFO] Starting from saved since value: {since}")
+        logger.info("Starting from saved since value: %s", since)
         
         async def process_user(user_data):
-            """Process a single user"""
-            user_db_session = SessionLocal()
+            """Process a single user, returning the row to insert or None"""
             username = user_data.get("login", "unknown")
             
             try:
-                # Get user details
-                details = github.get_user_details(username)
+                # Get user details (the GitHub helpers block on requests, so they run in
+                # worker threads to keep the event loop free for the other in-flight users)
+                details = await asyncio.to_thread(github.get_user_details, username)
                 if not details or isinstance(details, dict) and "message" in details:
-                    print(f"[ERROR] Failed to get details for @{username}: {details}")
+                    logger.error("Failed to get details for @%s: %s", username, details)
                     stats["errors"] += 1
                     return
                 
@@ -69,14 +160,14 @@ async def run():
                 email = details.get("email")
                 name = details.get("name") or username
                 
-                print(f"[INFO] Processing @{username} - Location: '{location}', Email: {email or 'None'}")
+                logger.debug("Processing @%s - Location: '%s', Email: %s", username, location, email or 'None')
 
                 # Try to get email from commits if not in profile
                 if not email:
-                    print(f"[INFO] No email in profile for @{username}, checking commits...")
-                    name, email = github.get_email_from_commits(username)
+                    logger.debug("No email in profile for @%s, checking commits...", username)
+                    name, email = await asyncio.to_thread(github.get_email_from_commits, username)
                     if email:
-                        print(f"[INFO] Found email from commits for @{username}: {email}")
+                        logger.debug("Found email from commits for @%s: %s", username, email)
                 
                 # Get country code or timezone
                 country_code = None
@@ -84,113 +175,132 @@ async def run():
                 
                 if not location:
                     # If location is empty, try to get timezone from commits
-                    print(f"[INFO] Location is empty for @{username}, checking commits for timezone...")
-                    timezone = github.get_timezone_from_commits(username)
+                    logger.debug("Location is empty for @%s, checking commits for timezone...", username)
+                    timezone = await asyncio.to_thread(github.get_timezone_from_commits, username)
                     if timezone:
-                        print(f"[Timezone] @{username} — Timezone: {timezone}")
+                        logger.debug("[Timezone] @%s — Timezone: %s", username, timezone)
                         # Convert timezone to country code
                         country_code = gpt_location.get_country_from_timezone(timezone)
                         if country_code:
-                            print(f"[Timezone] @{username} — Timezone {timezone} → Country: {country_code}")
+                            logger.debug("[Timezone] @%s — Timezone %s → Country: %s", username, timezone, country_code)
                         else:
-                            print(f"[Timezone] @{username} — Timezone {timezone} → Country: Unknown (could not map)")
+                            logger.debug("[Timezone] @%s — Timezone %s → Country: Unknown (could not map)", username, timezone)
                     else:
-                        print(f"[Timezone] @{username} — No timezone found in commits (no verification data)")
+                        logger.debug("[Timezone] @%s — No timezone found in commits (no verification data)", username)
                 else:
                     # If location exists, get country code from location
                     country_code = await gpt_location.get_country_code(location)
                     if country_code:
-                        print(f"[Location] @{username} — '{location}' → Country: {country_code}")
+                        logger.debug("[Location] @%s — '%s' → Country: %s", username, location, country_code)
                     else:
-                        print(f"[Location] @{username} — '{location}' → Country: Unknown")
+                        logger.debug("[Location] @%s — '%s' → Country: Unknown", username, location)
                 
                 if not email:
-                    print(f"[Skip] No email found for @{username}")
+                    logger.debug("[Skip] No email found for @%s", username)
                     stats["skipped_no_email"] += 1
                     return
 
-                # Check if user already exists by git_username or email
-                existing_user = user_db_session.query(models.User).filter(
-                    (models.User.git_username == username) | (models.User.email == email)
-                ).first()
-                if existing_user:
-                    print(f"[Skip] User @{username} (email: {email}) already exists in database")
-                    return
+                # Use country_code if available (preferred), otherwise fall back to timezone
+                # country_code is better because it's more specific than just timezone offset
+                country_or_timezone = country_code if country_code else (timezone if timezone else None)
+                
+                # Rows are inserted together once the whole batch is processed
+                return {
+                    "name": name,
+                    "location": location,
+                    "email": email,
+                    "git_username": username,
+                    "country": country_or_timezone
+                }
 
-                # Save to database
+            except Exception as e:
+                logger.exception("Error processing user @%s: %s", username, e)
+                stats["errors"] += 1
+
+        # Cap in-flight users so a batch doesn't burst through API rate limits or the DB pool
+        sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+        async def process_user_bounded(user_data):
+            """Process a single user once a concurrency slot is free"""
+            async with sem:
+                return await process_user(user_data)
+
+        async def fetch_batches(queue, page_since):
+            """Fetch pages of users ahead of the consumer so the next page is ready when a batch finishes"""
+            while True:
+                logger.info("Fetching users with since=%s...", page_since)
                 try:
-                    # Use country_code if available (preferred), otherwise fall back to timezone
-                    # country_code is better because it's more specific than just timezone offset
-                    country_or_timezone = country_code if country_code else (timezone if timezone else None)
-                    
-                    new_user = models.User(
-                        name=name, 
-                        location=location, 
-                        email=email, 
-                        git_username=username,
-                        country=country_or_timezone
-                    )
-                    user_db_session.add(new_user)
-                    user_db_session.commit()
-                    stats["saved"] += 1
-                    
-                    # Track by country/timezone
-                    country_key = country_or_timezone or "Unknown"
-                    stats["countries"][country_key] = stats["countries"].get(country_key, 0) + 1
-                    
-                    stats["processed_users"].append({
-                        "username": username,
-                        "name": name,
-                        "email": email,
-                        "location": location,
-                        "country": country_or_timezone
-                    })
-                    location_type = "country" if country_code else ("timezone" if timezone else "location")
-                    print(f"[SUCCESS] Saved user: {name} ({email}) with {location_type}: {country_or_timezone or 'Unknown'}")
-                except IntegrityError:
-                    user_db_session.rollback()
-                    print(f"[Skip] Duplicate user @{username} detected (database constraint violation)")
+                    users, next_since = await asyncio.to_thread(github.get_active_github_users, page_since)
+                except Exception as e:
+                    logger.exception("Error fetching users with since=%s: %s", page_since, e)
+                    users, next_since = None, None
+                await queue.put((users, next_since))
+                # Same end conditions as the consumer: stop paging once the last page is queued
+                if not users or isinstance(users, dict) or next_since is None or len(users) < 100:
                     return
+                page_since = next_since
 
-            except Exception as e:
-                print(f"[ERROR] Error processing user @{username}: {e}")
-                traceback.print_exc()
-                stats["errors"] += 1
-            finally:
-                user_db_session.close()
+        # Fetch the next page while the current batch is processed; a small bound keeps
+        # the producer from running far ahead of what has been checkpointed
+        batches = asyncio.Queue(maxsize=2)
+        producer = asyncio.create_task(fetch_batches(batches, since))
 
         # Continuously fetch and process users batch by batch
-        print("[INFO] Starting continuous fetch and process cycle...")
+        logger.info("Starting continuous fetch and process cycle...")
         
         while True:
             try:
-                # Fetch a batch of users
-                print(f"[INFO] Fetching users with since={since}...")
-                users, next_since = github.get_active_github_users(since)
+                # Take the next fetched batch of users
+                users, next_since = await batches.get()
+                
+                if users is None:
+                    # Save current since value on error
+                    save_since_value(db_session, since)
+                    stats["errors"] += 1
+                    break
                 
                 if not users:
-                    print(f"[INFO] No more users found. Stopping fetch.")
+                    logger.info("No more users found. Stopping fetch.")
                     # Save current since value before stopping
                     save_since_value(db_session, since)
                     break
                 
                 if isinstance(users, dict) and "message" in users:
-                    print(f"[ERROR] GitHub API error: {users.get('message')}")
+                    logger.error("GitHub API error: %s", users.get('message'))
                     # Save current since value on error
                     save_since_value(db_session, since)
                     break
                 
                 stats["total_fetched"] += len(users)
-                print(f"[INFO] Fetched {len(users)} users (total fetched: {stats['total_fetched']})")
+                logger.info("Fetched %s users (total fetched: %s)", len(users), stats['total_fetched'])
                 
                 # Process this batch immediately
-                print(f"[INFO] Processing batch of {len(users)} users...")
-                await asyncio.gather(*[process_user(u) for u in users], return_exceptions=True)
-                print(f"[INFO] Finished processing batch. Stats: saved={stats['saved']}, errors={stats['errors']}")
+                logger.info("Processing batch of %s users...", len(users))
+                github.clear_user_caches()
+                results = await asyncio.gather(*[process_user_bounded(u) for u in users], return_exceptions=True)
+                
+                # Save the batch with one INSERT
+                saved_rows = save_new_users(db_session, [r for r in results if isinstance(r, dict)])
+                for row in saved_rows:
+                    stats["saved"] += 1
+                    
+                    # Track by country/timezone
+                    country_key = row["country"] or "Unknown"
+                    stats["countries"][country_key] = stats["countries"].get(country_key, 0) + 1
+                    
+                    stats["processed_users"].append({
+                        "username": row["git_username"],
+                        "name": row["name"],
+                        "email": row["email"],
+                        "location": row["location"],
+                        "country": row["country"]
+                    })
+                    logger.info("Saved user: %s (%s) with country: %s", row['name'], row['email'], row['country'] or 'Unknown')
+                logger.info("Finished processing batch. Stats: saved=%s, errors=%s", stats['saved'], stats['errors'])
                 
                 # Update 'since' for next iteration
                 if next_since is None:
-                    print(f"[INFO] No next_since value returned. Stopping fetch.")
+                    logger.info("No next_since value returned. Stopping fetch.")
                     save_since_value(db_session, since)
                     break
                 
@@ -200,12 +310,11 @@ async def run():
                 
                 # If we got less than 100 users, we've reached the end
                 if len(users) < 100:
-                    print(f"[INFO] Received less than 100 users. Reached end of pagination.")
+                    logger.info("Received less than 100 users. Reached end of pagination.")
                     break
                     
             except Exception as e:
-                print(f"[ERROR] Error in fetch/process cycle: {e}")
-                traceback.print_exc()
+                logger.exception("Error in fetch/process cycle: %s", e)
                 # Save current since value on error
                 save_since_value(db_session, since)
                 stats["errors"] += 1
@@ -219,8 +328,7 @@ async def run():
         }
         
     except Exception as e:
-        print(f"[ERROR] Fatal error: {e}")
-        traceback.print_exc()
+        logger.exception("Fatal error: %s", e)
         # Save current since value on fatal error
         try:
             save_since_value(db_session, since)
@@ -233,65 +341,76 @@ async def run():
             "last_since_value": since if 'since' in locals() else None
         }
     finally:
+        if 'producer' in locals():
+            producer.cancel()
         db_session.close()
 
 
-@app.get("/users", response_model=List[dict])
-def get_users(db: Session = Depends(get_db)):
-    """Get all saved users from database"""
-    users = db.query(models.User).all()
-    return [
-        {
-            "id": user.id,
-            "name": user.name,
-            "email": user.email,
-            "location": user.location,
-            "git_username": user.git_username,
-            "country": user.country,
-            "contacted": user.contacted,
-            "responded": user.responded
-        }
-        for user in users
-    ]
+# Columns returned for each user by the /users endpoints
+USER_COLUMNS = (
+    models.User.id,
+    models.User.name,
+    models.User.email,
+    models.User.location,
+    models.User.git_username,
+    models.User.country,
+    models.User.contacted,
+    models.User.responded
+)
+# Rows fetched per round trip from the server-side cursor while streaming
+USER_STREAM_CHUNK = 1000
+
+
+def stream_users(*criteria):
+    """
+    Yield matching users as newline-delimited JSON, one chunk of rows at a time.
+    Uses its own session because the response body is produced after the endpoint returns.
+    """
+    db_session = SessionLocal()
+    try:
+        stmt = select(*USER_COLUMNS).where(*criteria).execution_options(yield_per=USER_STREAM_CHUNK)
+        for rows in db_session.execute(stmt).partitions():
+            yield b"".join(orjson.dumps(dict(row._mapping)) + b"\n" for row in rows)
+    finally:
+        db_session.close()
+
+
+@app.get("/users")
+def get_users():
+    """Get all saved users from database (streamed as NDJSON, one user per line)"""
+    return StreamingResponse(stream_users(), media_type="application/x-ndjson")
 
 
 @app.get("/users/count")
 def get_user_count(db: Session = Depends(get_db)):
     """Get count of saved users"""
-    count = db.query(models.User).count()
+    count = db.execute(select(func.count()).select_from(models.User)).scalar_one()
     return {"total_users": count}
 
 
 @app.get("/users/by-country")
 def get_users_by_country(db: Session = Depends(get_db)):
     """Get count of users grouped by country"""
-    from sqlalchemy import func
-    results = db.query(
-        models.User.country,
-        func.count(models.User.id).label('count')
-    ).group_by(models.User.country).all()
+    results = db.execute(
+        select(models.User.country, func.count().label('count')).group_by(models.User.country)
+    )
+    
+    by_country = {}
+    for country, count in results:
+        key = country or "Unknown"
+        by_country[key] = by_country.get(key, 0) + count
     
     return {
-        "by_country": {country or "Unknown": count for country, count in results},
-        "total_countries": len(results),
-        "total_users": sum(count for _, count in results)
+        "by_country": by_country,
+        "total_countries": len(by_country),
+        "total_users": sum(by_country.values())
     }
 
 
 @app.get("/users/country/{country_code}")
-def get_users_by_country_code(country_code: str, db: Session = Depends(get_db)):
-    """Get all users from a specific country"""
-    users = db.query(models.User).filter(models.User.country == country_code.upper()).all()
-    return [
-        {
-            "id": user.id,
-            "name": user.name,
-            "email": user.email,
-            "location": user.location,
-            "git_username": user.git_username,
-            "country": user.country,
-            "contacted": user.contacted,
-            "responded": user.responded
-        }
-        for user in users
-    ]
+def get_users_by_country_code(country_code: str):
+    """Get all users from a specific country (streamed as NDJSON, one user per line)"""
+    return StreamingResponse(
+        stream_users(models.User.country == country_code.upper()),
+        media_type="application/x-ndjson"
+    )
@@ -11,7 +11,7 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String(255))
     location = Column(String(255))
-    email = Column(String(255), nullable=True)
+    email = Column(String(255), nullable=True, index=True)
     country = Column(String(10), nullable=True, index=True)  # ISO country code (e.g., 'PK', 'US', 'NO') or timezone offset (e.g., '+0300', '-0500')
     contacted = Column(Boolean, default=False)
     responded = Column(Boolean, default=False)